@@ -1,10 +1,14 @@
 import os
-import json
 import requests
 import joblib
 import tldextract
-from flask import Flask, render_template, request
+from flask import Flask, render_template, request, jsonify
 from dotenv import load_dotenv
+from src.scheduler import serp_scheduler, INTERACTIVE, BULK
+from src.backends import (
+    get_backend, MemoryBackend, ResponseCache, VerdictCache, HistoryStore, FileHistoryStore,
+    HashRing, normalize_claim
+)
 
 # Load API key
 load_dotenv()
@@ -21,18 +25,28 @@ VEC_PATH = "models/tfidf_vectorizer.joblib"
 model = joblib.load(MODEL_PATH)
 vectorizer = joblib.load(VEC_PATH)
 
+# ------------------------------
+# Storage backends (CACHE_BACKEND=memory|redis)
+# ------------------------------
+backend = get_backend()
+response_cache = ResponseCache(backend, ttl=int(os.getenv("RESPONSE_CACHE_TTL", "3600")))
+verdict_cache = VerdictCache(backend, ttl=int(os.getenv("VERDICT_CACHE_TTL", "3600")))
+# A single in-process node keeps the history.json file; shared backends hold it for all nodes
+history_store = FileHistoryStore(HISTORY_FILE) if isinstance(backend, MemoryBackend) else HistoryStore(backend)
+
+# Claim routing across app nodes (APP_NODES=comma-separated node URLs), so a
+# load balancer can send repeat checks to the node that already holds them warm
+APP_NODES = [n.strip() for n in os.getenv("APP_NODES", "").split(",") if n.strip()]
+node_ring = HashRing(APP_NODES) if APP_NODES else None
+
 # ------------------------------
 # Helper: load & save history
 # ------------------------------
 def load_history():
-    if os.path.exists(HISTORY_FILE):
-        with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
+    return history_store.all()
 
-def save_history(history):
-    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history, f, indent=2)
+def save_history_entry(entry):
+    history_store.append(entry)
 
 # ------------------------------
 # Domain Extractor
@@ -44,11 +58,45 @@ def domain_of(url: str) -> str:
 # ------------------------------
 # SerpAPI Helper
 # ------------------------------
-def serpapi_search(query, engine="google"):
-    url = "https://serpapi.com/search.json"
-    params = {"engine": engine, "q": query, "api_key": SERP_API_KEY}
-    response = requests.get(url, params=params)
-    return response.json()
+def serpapi_search(query, engine="google", priority=BULK):
+    """Return the SerpAPI response, or None if the query was rejected or failed."""
+    cached = response_cache.get(query, engine)
+    if cached is not None:
+        return cached
+
+    # Every query goes through the shared scheduler (rate limit + daily quota)
+    if not serp_scheduler.acquire(priority):
+        return None
+    try:
+        url = "https://serpapi.com/search.json"
+        params = {"engine": engine, "q": query, "api_key": SERP_API_KEY}
+        response = requests.get(url, params=params, timeout=10)
+        if response.status_code != 200:   # includes 429 throttling
+            print("[SerpAPI] HTTP", response.status_code)
+            return None
+        data = response.json()
+        if "error" in data:
+            print("[SerpAPI] error:", data["error"])
+            return None
+    except Exception as e:
+        print("[SerpAPI] error:", e)
+        return None
+    response_cache.set(query, engine, data)
+    return data
+
+# ------------------------------
+# Model-only fallback (no search results available)
+# ------------------------------
+def model_verdict(claim):
+    proba = model.predict_proba(vectorizer.transform([claim]))[0]
+    is_fake = proba[1] >= proba[0]   # label 1 = Fake
+    confidence = round(max(proba) * 100, 2)
+    return {
+        "label": ("Model: FALSE ❌" if is_fake else "Model: TRUE ✅") + " (search unavailable)",
+        "confidence": f"{confidence}%",
+        "votes": {"True": 0, "False": 0, "Uncertain": 0},
+        "sources": ["ML model"]
+    }
 
 # ------------------------------
 # Classifier for snippets
@@ -73,12 +121,30 @@ def classify_source_verdict(text: str) -> str:
 # ------------------------------
 # Voting Logic
 # ------------------------------
-def vote_on_claim(claim):
+def vote_on_claim(claim, priority=BULK):
+    cached = verdict_cache.get(claim)
+    if cached is not None:
+        return cached
+
+    # Passes in order of importance; the scheduler trims them when the budget runs low
+    passes = serp_scheduler.plan(["web", "news", "wiki"], priority)
+    if not passes:
+        return model_verdict(claim)
+
+    results_web = serpapi_search(claim, engine="google", priority=priority) if "web" in passes else None
+    results_news = serpapi_search(claim, engine="google_news", priority=priority) if "news" in passes else None
+    results_wiki = serpapi_search(claim + " site:wikipedia.org", engine="google", priority=priority) if "wiki" in passes else None
+
+    # Planned passes can still be rejected (wait timeout, quota spent mid-claim) or fail
+    answered = [r for r in (results_web, results_news, results_wiki) if r is not None]
+    if not answered:
+        return model_verdict(claim)
+    results_web, results_news, results_wiki = results_web or {}, results_news or {}, results_wiki or {}
+
     votes = {"True": 0, "False": 0, "Uncertain": 0}
     sources_checked = []
 
     # ---- Google Search ----
-    results_web = serpapi_search(claim, engine="google")
     if "organic_results" in results_web:
         for res in results_web["organic_results"][:5]:
             link = res.get("link", "")
@@ -91,7 +157,6 @@ def vote_on_claim(claim):
             sources_checked.append(domain)
 
     # ---- Google News ----
-    results_news = serpapi_search(claim, engine="google_news")
     if "news_results" in results_news:
         for res in results_news["news_results"][:5]:
             link = res.get("link", "")
@@ -104,7 +169,6 @@ def vote_on_claim(claim):
             sources_checked.append(domain)
 
     # ---- Wikipedia ----
-    results_wiki = serpapi_search(claim + " site:wikipedia.org", engine="google")
     if "organic_results" in results_wiki and results_wiki["organic_results"]:
         snippet = results_wiki["organic_results"][0].get("snippet", "")
         verdict = classify_source_verdict(snippet)
@@ -122,12 +186,16 @@ def vote_on_claim(claim):
     total_votes = votes["True"] + votes["False"]
     confidence = round((max(votes["True"], votes["False"]) / total_votes) * 100, 2) if total_votes > 0 else 0
 
-    return {
+    result = {
         "label": verdict,
         "confidence": f"{confidence}%" if confidence > 0 else "0%",
         "votes": votes,
         "sources": list(set(sources_checked))
     }
+    # Only cache verdicts where all three searches answered, so degraded ones get re-checked
+    if len(answered) == 3:
+        verdict_cache.set(claim, result)
+    return result
 
 # ------------------------------
 # Routes
@@ -136,21 +204,19 @@ def vote_on_claim(claim):
 def index():
     prediction_style = None
     sms_check = None
-    history = load_history()
 
     if request.method == "POST":
         if "claim" in request.form and request.form["claim"].strip():
             claim = request.form["claim"].strip()
-            prediction_style = vote_on_claim(claim)
+            prediction_style = vote_on_claim(claim, priority=INTERACTIVE)
 
-            history.append({
+            save_history_entry({
                 "type": "News Claim",
                 "text": claim,
                 "result": prediction_style["label"],
                 "confidence": prediction_style["confidence"],
                 "sources": prediction_style["sources"]
             })
-            save_history(history)
 
         elif "sms" in request.form and request.form["sms"].strip():
             sms = request.form["sms"].strip().lower()
@@ -159,13 +225,12 @@ def index():
             else:
                 sms_check = "✅ SMS seems Safe"
 
-            history.append({
+            save_history_entry({
                 "type": "Bank SMS",
                 "text": sms,
                 "result": sms_check,
                 "confidence": "-"
             })
-            save_history(history)
 
     return render_template("index.html", prediction_style=prediction_style, sms_check=sms_check)
 
@@ -174,5 +239,15 @@ def show_history():
     history = load_history()
     return render_template("history.html", history=history)
 
+@app.route("/route")
+def route_claim():
+    claim = request.args.get("claim", "")
+    node = node_ring.node_for(normalize_claim(claim)) if node_ring else None
+    return jsonify({"claim": claim, "node": node})
+
+@app.route("/scheduler")
+def scheduler_stats():
+    return jsonify(serp_scheduler.stats())
+
 if __name__ == "__main__":
     app.run(debug=True)
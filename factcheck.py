@@ -3,17 +3,20 @@ import requests
 from dotenv import load_dotenv
 from collections import Counter
 from utils import clean_text, is_credible
+from src.scheduler import serp_scheduler, BULK
 
 load_dotenv()
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
 
-def fact_check_with_serp(claim: str, num_results: int = 5):
+def fact_check_with_serp(claim: str, num_results: int = 5, priority=BULK):
     """
     Cross-check claim against SERP API (Google News/Wikipedia).
     Returns majority vote + confidence.
     """
     if not SERPAPI_KEY:
         return {"label": "Unverifiable (no API key)", "confidence": 0.0}
+    if not serp_scheduler.acquire(priority):
+        return {"label": "Unverifiable (search budget or rate limit)", "confidence": 0.0}
 
     url = "https://serpapi.com/search"
     params = {
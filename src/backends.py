@@ -0,0 +1,516 @@
+import os
+import json
+import time
+import bisect
+import select
+import socket
+import hashlib
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+try:
+    import fcntl          # POSIX only
+except ImportError:
+    fcntl = None
+
+# ======================
+# In-process backend
+# ======================
+class MemoryBackend:
+    """
+    Thread-safe dict/list store with optional per-key TTL (single process only).
+    Expired keys are swept every `sweep_every` writes and the oldest values are
+    evicted beyond `max_keys` (None = never evict), so unique cache keys
+    cannot grow memory forever.
+    """
+    def __init__(self, max_keys=10000, sweep_every=500):
+        self.max_keys = max_keys
+        self.sweep_every = sweep_every
+        self._lock = threading.Lock()
+        self._values = {}      # insertion order = age, used for eviction
+        self._expiry = {}
+        self._lists = {}
+        self._writes = 0
+
+    def _expired(self, key):
+        deadline = self._expiry.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self._values.pop(key, None)
+            self._expiry.pop(key, None)
+            return True
+        return False
+
+    def _sweep(self):
+        now = time.monotonic()
+        for key in [k for k, deadline in self._expiry.items() if deadline <= now]:
+            self._values.pop(key, None)
+            self._expiry.pop(key, None)
+
+    def get(self, key):
+        with self._lock:
+            if self._expired(key):
+                return None
+            return self._values.get(key)
+
+    def set(self, key, value, ttl=None):
+        """Store `value`; ttl=None keeps it forever, ttl <= 0 stores nothing."""
+        with self._lock:
+            self._values.pop(key, None)
+            self._expiry.pop(key, None)
+            if ttl is not None and ttl <= 0:
+                return
+            self._values[key] = value
+            if ttl is not None:
+                self._expiry[key] = time.monotonic() + ttl
+
+            self._writes += 1
+            if self._writes % self.sweep_every == 0:
+                self._sweep()
+            while self.max_keys is not None and len(self._values) > self.max_keys:
+                oldest = next(iter(self._values))
+                self._values.pop(oldest)
+                self._expiry.pop(oldest, None)
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+            self._expiry.pop(key, None)
+            self._lists.pop(key, None)
+
+    def incr(self, key, amount=1, ttl=None):
+        """Add `amount` to an integer counter and return the new value; `ttl` applies on creation."""
+        with self._lock:
+            created = self._expired(key) or key not in self._values
+            value = int(self._values.pop(key, 0)) + amount
+            self._values[key] = str(value)
+            if created and ttl is not None:
+                self._expiry[key] = time.monotonic() + ttl
+            return value
+
+    def rpush(self, key, value):
+        with self._lock:
+            self._lists.setdefault(key, []).append(value)
+
+    def lrange(self, key):
+        with self._lock:
+            return list(self._lists.get(key, []))
+
+
+# ======================
+# Networked backend (Redis protocol)
+# ======================
+class RedisBackend:
+    """
+    Minimal RESP client speaking GET / SET EX / DEL / RPUSH / LRANGE,
+    so any Redis-compatible server (or a local stand-in) can be used.
+
+    After a connection failure the backend is marked down for `retry_after`
+    seconds and fails fast, so an outage does not add a timeout to every call.
+    """
+    def __init__(self, host="localhost", port=6379, db=0, password=None, timeout=2.0,
+                 retry_after=5.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._sock = None
+        self._reader = None
+        self._down_until = 0.0
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs):
+        """Build from redis://[:password@]host[:port][/db]."""
+        parsed = urlparse(url)
+        db = parsed.path.lstrip("/")
+        return cls(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(db) if db else 0,
+            password=parsed.password,
+            **kwargs,
+        )
+
+    def __repr__(self):
+        return f"RedisBackend({self.host}:{self.port}/{self.db})"
+
+    # ---------- connection + RESP ----------
+    def _connect(self):
+        try:
+            self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            self._reader = self._sock.makefile("rb")
+            if self.password:
+                self._roundtrip("AUTH", self.password)
+            if self.db:
+                self._roundtrip("SELECT", self.db)
+        except Exception:
+            # Never keep a half-initialised connection (e.g. SELECT failed -> wrong db)
+            self._close()
+            raise
+
+    def _close(self):
+        for handle in (self._reader, self._sock):
+            if handle is not None:
+                try:
+                    handle.close()
+                except OSError:
+                    pass
+        self._sock = None
+        self._reader = None
+
+    def _stale(self):
+        """An idle connection that is readable means the server hung up (or sent junk)."""
+        try:
+            readable, _, _ = select.select([self._sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    @staticmethod
+    def _encode(args):
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(out)
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode("utf-8")
+        if kind == b"-":
+            raise RuntimeError(f"Redis error: {body.decode('utf-8')}")
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Redis connection closed mid-reply")
+            return data[:-2].decode("utf-8")
+        if kind == b"*":
+            count = int(body)
+            if count < 0:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise ConnectionError(f"Unexpected Redis reply: {line!r}")
+
+    def _roundtrip(self, *args):
+        self._sock.sendall(self._encode(args))
+        return self._read_reply()
+
+    def command(self, *args):
+        """
+        Send one command. A dead connection is replaced before sending, but a
+        command that reached the wire is never resent, so RPUSH cannot apply twice.
+        """
+        payload = self._encode(args)
+        with self._lock:
+            if time.monotonic() < self._down_until:
+                raise ConnectionError(f"{self!r} marked down after a recent failure")
+            if self._sock is not None and self._stale():
+                self._close()
+            while True:
+                reused = self._sock is not None
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._sock.sendall(payload)
+                    break
+                except (OSError, ConnectionError):
+                    self._close()
+                    if not reused:   # a fresh connection failed: the server is unreachable
+                        self._down_until = time.monotonic() + self.retry_after
+                        raise
+            try:
+                return self._read_reply()
+            except RuntimeError:
+                raise           # error reply was read in full; connection is still usable
+            except Exception:
+                self._close()   # reply state unknown: drop the connection, do not retry
+                self._down_until = time.monotonic() + self.retry_after
+                raise
+
+    # ---------- store API ----------
+    def get(self, key):
+        return self.command("GET", key)
+
+    def set(self, key, value, ttl=None):
+        """Store `value`; ttl=None keeps it forever, ttl <= 0 stores nothing."""
+        if ttl is None:
+            self.command("SET", key, value)
+        elif ttl <= 0:
+            self.command("DEL", key)
+        else:
+            self.command("SET", key, value, "PX", max(1, int(ttl * 1000)))
+
+    def delete(self, key):
+        self.command("DEL", key)
+
+    def incr(self, key, amount=1, ttl=None):
+        """Add `amount` to an integer counter and return the new value; `ttl` applies on creation."""
+        value = self.command("INCRBY", key, amount)
+        if ttl is not None and value == amount:
+            self.command("EXPIRE", key, max(1, int(ttl)))
+        return value
+
+    def rpush(self, key, value):
+        self.command("RPUSH", key, value)
+
+    def lrange(self, key):
+        return self.command("LRANGE", key, 0, -1) or []
+
+
+# ======================
+# Consistent-hash sharding
+# ======================
+class HashRing:
+    """Consistent-hash ring: each key maps to one node; adding a node only moves ~1/N keys."""
+    def __init__(self, nodes, replicas=100):
+        self.replicas = replicas
+        self._ring = []      # sorted hashes
+        self._owners = {}    # hash -> node name
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int(hashlib.md5(value.encode("utf-8")).hexdigest()[:16], 16)
+
+    def add(self, node):
+        for i in range(self.replicas):
+            h = self._hash(f"{node}#{i}")
+            bisect.insort(self._ring, h)
+            self._owners[h] = node
+
+    def remove(self, node):
+        for i in range(self.replicas):
+            h = self._hash(f"{node}#{i}")
+            if self._owners.pop(h, None) is not None:
+                self._ring.remove(h)
+
+    def node_for(self, key: str):
+        if not self._ring:
+            raise ValueError("HashRing has no nodes")
+        idx = bisect.bisect(self._ring, self._hash(key)) % len(self._ring)
+        return self._owners[self._ring[idx]]
+
+
+class ShardedBackend:
+    """Routes every key to one of several backends via a HashRing."""
+    def __init__(self, backends: dict, replicas=100):
+        self.backends = dict(backends)
+        self.ring = HashRing(self.backends, replicas=replicas)
+
+    def backend_for(self, key):
+        return self.backends[self.ring.node_for(key)]
+
+    def get(self, key):
+        return self.backend_for(key).get(key)
+
+    def set(self, key, value, ttl=None):
+        self.backend_for(key).set(key, value, ttl)
+
+    def delete(self, key):
+        self.backend_for(key).delete(key)
+
+    def incr(self, key, amount=1, ttl=None):
+        return self.backend_for(key).incr(key, amount, ttl)
+
+    def rpush(self, key, value):
+        self.backend_for(key).rpush(key, value)
+
+    def lrange(self, key):
+        return self.backend_for(key).lrange(key)
+
+
+# ======================
+# Stores built on a backend
+# ======================
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def normalize_claim(claim: str) -> str:
+    """Case/whitespace-insensitive form so repeat checks share a key."""
+    return " ".join(claim.lower().split())
+
+
+class JsonCache:
+    """
+    JSON values in a backend under `key(*parts)`, expiring after `ttl` seconds
+    (ttl <= 0 disables the cache). Backend errors and undecodable values are
+    logged and treated as misses, so caching never fails a request.
+    """
+    def __init__(self, backend, ttl=3600):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = ttl > 0
+
+    def key(self, *parts):
+        raise NotImplementedError
+
+    def get(self, *parts):
+        if not self.enabled:
+            return None
+        try:
+            raw = self.backend.get(self.key(*parts))
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            print("[Cache] error:", e)
+            return None
+
+    def set(self, *args):
+        """set(*parts, value)"""
+        if not self.enabled:
+            return
+        *parts, value = args
+        try:
+            self.backend.set(self.key(*parts), json.dumps(value), self.ttl)
+        except Exception as e:
+            print("[Cache] error:", e)
+
+
+class ResponseCache(JsonCache):
+    """Raw SerpAPI responses per (query, engine)."""
+    def key(self, query, engine):
+        return f"serp:{engine}:{_digest(query)}"
+
+
+class VerdictCache(JsonCache):
+    """Final verdicts per normalized claim."""
+    def key(self, claim):
+        return f"verdict:{_digest(normalize_claim(claim))}"
+
+
+class HistoryStore:
+    """Append-only detection history kept in a backend list. Fails open on backend errors."""
+    KEY = "history"
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def append(self, entry):
+        try:
+            self.backend.rpush(self.KEY, json.dumps(entry))
+        except Exception as e:
+            print("[History] error:", e)
+
+    def all(self):
+        try:
+            return [json.loads(item) for item in self.backend.lrange(self.KEY)]
+        except Exception as e:
+            print("[History] error:", e)
+            return []
+
+
+class FileHistoryStore:
+    """
+    Single-node history in a JSON file (the original history.json format).
+    Load/append/replace runs under an flock on `<path>.lock`, so several worker
+    processes on one node do not lose each other's entries. Without fcntl
+    (Windows) only one process may write the file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self, exclusive=True):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return []
+
+    def append(self, entry):
+        with self._locked():
+            history = self._load()
+            history.append(entry)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(history, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def all(self):
+        with self._locked(exclusive=False):
+            return self._load()
+
+
+# ======================
+# Factory (configured from environment)
+# ======================
+def backend_from_env():
+    """
+    CACHE_BACKEND=memory (default) -> MemoryBackend
+    CACHE_BACKEND=redis            -> REDIS_URLS (comma-separated); several URLs are sharded
+    """
+    kind = os.getenv("CACHE_BACKEND", "memory").strip().lower()
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "redis":
+        urls = [u.strip() for u in os.getenv("REDIS_URLS", "redis://localhost:6379/0").split(",") if u.strip()]
+        if len(urls) == 1:
+            return RedisBackend.from_url(urls[0])
+        return ShardedBackend({url: RedisBackend.from_url(url) for url in urls})
+    raise ValueError(f"Unknown CACHE_BACKEND: {kind!r} (expected 'memory' or 'redis')")
+
+
+_shared_backend = None
+_shared_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    Process-wide backend built once from the environment. Import it as
+    `src.backends` everywhere so every caller shares the same instance.
+    """
+    global _shared_backend
+    with _shared_lock:
+        if _shared_backend is None:
+            _shared_backend = backend_from_env()
+        return _shared_backend
+
+
+_counter_backend = None
+
+
+def get_counter_backend():
+    """
+    Process-wide store for counters that must never be evicted (the SerpAPI
+    daily quota). In memory mode it is a separate, uncapped MemoryBackend, so
+    cache writes cannot push the counter out. In redis mode it is
+    QUOTA_REDIS_URL if set, else the shared backend; that Redis must run with
+    `maxmemory-policy noeviction`, since any LRU/LFU policy can evict the
+    quota key and silently reset the budget.
+    """
+    global _counter_backend
+    with _shared_lock:
+        if _counter_backend is None:
+            kind = os.getenv("CACHE_BACKEND", "memory").strip().lower()
+            quota_url = os.getenv("QUOTA_REDIS_URL", "").strip()
+            if kind == "memory":
+                _counter_backend = MemoryBackend(max_keys=None)
+            elif quota_url:
+                _counter_backend = RedisBackend.from_url(quota_url)
+    return _counter_backend or get_backend()
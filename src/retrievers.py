@@ -2,23 +2,37 @@ import os
 import requests
 from dotenv import load_dotenv
 from utils import is_credible, domain_of
+from src.scheduler import serp_scheduler, BULK
+from src.backends import get_backend, ResponseCache
 
 load_dotenv()
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
+response_cache = ResponseCache(get_backend(), ttl=int(os.getenv("RESPONSE_CACHE_TTL", "3600")))
 
-def serpapi_search(query: str, engine="google"):
-    """Generic SerpAPI search wrapper."""
+def serpapi_search(query: str, engine="google", priority=BULK):
+    """
+    Generic SerpAPI search wrapper (rate-limited via the shared scheduler).
+    Returns None if the scheduler rejected the query or the request failed.
+    """
     if not SERPAPI_KEY:
         return {}
+    cached = response_cache.get(query, engine)
+    if cached is not None:
+        return cached
+    if not serp_scheduler.acquire(priority):
+        return None
     try:
         url = "https://serpapi.com/search"
         params = {"engine": engine, "q": query, "api_key": SERPAPI_KEY}
         resp = requests.get(url, params=params, timeout=10)
         if resp.status_code == 200:
-            return resp.json()
+            data = resp.json()
+            if "error" not in data:
+                response_cache.set(query, engine, data)
+                return data
     except Exception as e:
         print("[SerpAPI] error:", e)
-    return {}
+    return None
 
 def classify_source_verdict(text: str) -> str:
     """Return True / False / Uncertain based on snippet text."""
@@ -30,12 +44,26 @@ def classify_source_verdict(text: str) -> str:
     else:
         return "Uncertain"
 
-def vote_on_claim(claim: str):
+def vote_on_claim(claim: str, priority=BULK):
+    passes = serp_scheduler.plan(["web", "news", "wiki"], priority)
+    results_web = serpapi_search(claim, engine="google", priority=priority) if "web" in passes else None
+    results_news = serpapi_search(claim, engine="google_news", priority=priority) if "news" in passes else None
+    results_wiki = serpapi_search(claim + " site:wikipedia.org", engine="google", priority=priority) if "wiki" in passes else None
+
+    # No search answered (budget spent, rate-limited or failing): say so instead of "Uncertain"
+    if all(r is None for r in (results_web, results_news, results_wiki)):
+        return {
+            "label": "Unverifiable (search budget or rate limit)",
+            "confidence": "0%",
+            "votes": {"True": 0, "False": 0, "Uncertain": 0},
+            "sources": []
+        }
+    results_web, results_news, results_wiki = results_web or {}, results_news or {}, results_wiki or {}
+
     votes = {"True": 0, "False": 0, "Uncertain": 0}
     sources_checked = []
 
     # ---- Google Search ----
-    results_web = serpapi_search(claim, engine="google")
     if "organic_results" in results_web:
         for res in results_web["organic_results"][:8]:
             link = res.get("link", "")
@@ -48,7 +76,6 @@ def vote_on_claim(claim: str):
             sources_checked.append(domain_of(link))
 
     # ---- Google News ----
-    results_news = serpapi_search(claim, engine="google_news")
     if "news_results" in results_news:
         for res in results_news["news_results"][:5]:
             link = res.get("link", "")
@@ -61,7 +88,6 @@ def vote_on_claim(claim: str):
             sources_checked.append(domain_of(link))
 
     # ---- Wikipedia Direct ----
-    results_wiki = serpapi_search(claim + " site:wikipedia.org", engine="google")
     if "organic_results" in results_wiki and results_wiki["organic_results"]:
         snippet = results_wiki["organic_results"][0].get("snippet", "")
         verdict = classify_source_verdict(snippet)
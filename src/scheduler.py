@@ -0,0 +1,276 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+from datetime import datetime, timezone
+from src.backends import get_counter_backend
+
+# ======================
+# Priorities
+# (lower value is served first)
+# ======================
+INTERACTIVE = 0   # web form traffic
+BULK = 1          # batch / offline jobs
+
+
+def _env_float(name: str, default):
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return float(value)
+
+
+# ======================
+# SerpAPI Scheduler
+# ======================
+class SerpScheduler:
+    """
+    Central gate in front of every SerpAPI call.
+
+    - token bucket: `rate` queries per second, bursting up to `burst`
+    - daily quota: at most `daily_quota` queries per UTC day (None = unlimited)
+    - priority queue: INTERACTIVE callers are admitted before BULK ones
+    - `reserve` queries of the daily quota are kept for INTERACTIVE traffic
+
+    With a `counter` backend (see src.backends) the daily quota is counted in
+    that shared store, so every node drawing from it spends one budget. The
+    token bucket stays per process: give each of N processes rate/N.
+
+    Invalid settings raise ValueError at construction instead of silently
+    disabling the limit or blocking every caller.
+    """
+    def __init__(self, rate=1.0, burst=5, daily_quota=None, reserve=0,
+                 low_water=10, max_wait=15.0, counter=None, clock=time.monotonic, today=None):
+        if rate <= 0:
+            raise ValueError(f"rate must be > 0, got {rate}")
+        if burst < 1:
+            raise ValueError(f"burst must be >= 1, got {burst}")
+        if daily_quota is not None and daily_quota < 0:
+            raise ValueError(f"daily_quota must be >= 0 or None, got {daily_quota}")
+        if reserve < 0 or (daily_quota is not None and reserve > daily_quota):
+            raise ValueError(f"reserve must be between 0 and daily_quota, got {reserve}")
+        if low_water < 0:
+            raise ValueError(f"low_water must be >= 0, got {low_water}")
+        if max_wait is not None and max_wait < 0:
+            raise ValueError(f"max_wait must be >= 0 or None, got {max_wait}")
+
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.daily_quota = int(daily_quota) if daily_quota is not None else None   # 0 = no searches
+        self.reserve = int(reserve)
+        self.low_water = int(low_water)
+        self.max_wait = max_wait
+        self.counter = counter
+        self._clock = clock                 # injectable for tests
+        self._today = today or self._utc_today
+
+        self._cond = threading.Condition()
+        self._tokens = self.burst
+        self._last_refill = self._clock()
+        self._day = self._today()
+        self._used = 0                      # queries admitted by this process today
+        self._shared_used = 0               # last shared count seen today (from INCRBY)
+        self._counter_down = False          # log outages once, not per query
+        self._waiting = []                  # heap of (priority, seq)
+        self._seq = itertools.count()
+
+        self._admitted = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+        self._last_wait = 0.0
+
+    # ---------- internals (call with self._cond held) ----------
+    @staticmethod
+    def _utc_today():
+        return datetime.now(timezone.utc).date()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._used = 0
+            self._shared_used = 0
+
+    def _quota_key(self):
+        return f"serp:quota:{self._day.isoformat()}"
+
+    def _limit(self, priority):
+        return self.daily_quota - (0 if priority == INTERACTIVE else self.reserve)
+
+    def _shared(self):
+        return self.daily_quota is not None and self.counter is not None
+
+    def _used_today(self):
+        """
+        Queries spent today. With a shared counter this is the last value INCRBY
+        returned (no round-trip): only an early-out, INCRBY enforces the limit.
+        """
+        if self._shared():
+            return max(self._shared_used, self._used)
+        return self._used
+
+    def _remaining(self, priority):
+        if self.daily_quota is None:
+            return None
+        return max(self._limit(priority) - self._used_today(), 0)
+
+    def _consume_shared(self, key, limit):
+        """
+        Spend one query on the shared counter; False if another node took the
+        last one. Called WITHOUT self._cond held so a slow backend only delays
+        this caller, not every waiter.
+        """
+        try:
+            used = self.counter.incr(key, 1, ttl=2 * 86400)
+            admitted = used <= limit
+            if not admitted:
+                used = self.counter.incr(key, -1)
+        except Exception as e:
+            # Shared counter unreachable: fall back to this process's own count
+            with self._cond:
+                if not self._counter_down:
+                    self._counter_down = True
+                    print("[Scheduler] quota counter unreachable, counting locally:", e)
+                admitted = self._used < limit
+                if admitted:
+                    self._used += 1
+            return admitted
+
+        with self._cond:
+            if self._counter_down:
+                self._counter_down = False
+                print("[Scheduler] quota counter reachable again")
+            if admitted:
+                self._used += 1
+            if key == self._quota_key():
+                self._shared_used = max(self._shared_used, used)
+        return admitted
+
+    # ---------- public API ----------
+    def remaining(self, priority=INTERACTIVE):
+        """Queries still available today for `priority` (None if unlimited)."""
+        with self._cond:
+            self._refill()
+            return self._remaining(priority)
+
+    def plan(self, engines, priority=INTERACTIVE):
+        """
+        Pick which of `engines` (ordered most to least important) to query.
+        Degrades to the first engine when the budget is low and to none
+        (model-only verdict) when it is exhausted.
+        """
+        left = self.remaining(priority)
+        if left is None or (left >= len(engines) and left > self.low_water):
+            return list(engines)
+        if left <= 0:
+            return []
+        return list(engines[:1])
+
+    def acquire(self, priority=BULK, timeout=None):
+        """
+        Block until a query may be sent. Returns False if the daily quota
+        is spent or no slot opened up within `timeout` seconds.
+        """
+        if timeout is None:
+            timeout = self.max_wait
+        start = self._clock()
+        deadline = start + timeout if timeout is not None else None
+        entry = (priority, next(self._seq))
+
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    self._refill()
+                    left = self._remaining(priority)
+                    if left is not None and left <= 0:
+                        self._rejected += 1
+                        return False
+
+                    if self._waiting[0] == entry and self._tokens >= 1:
+                        self._tokens -= 1
+                        shared = self._shared()
+                        if shared:
+                            key, limit = self._quota_key(), self._limit(priority)
+                        else:
+                            self._used += 1
+                        break
+
+                    wait = None
+                    if self._waiting[0] == entry:
+                        wait = (1 - self._tokens) / self.rate
+                    if deadline is not None:
+                        until_deadline = deadline - self._clock()
+                        if until_deadline <= 0:
+                            self._rejected += 1
+                            return False
+                        wait = until_deadline if wait is None else min(wait, until_deadline)
+                    self._cond.wait(wait)
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+        admitted = self._consume_shared(key, limit) if shared else True
+        with self._cond:
+            if not admitted:
+                self._tokens = min(self.burst, self._tokens + 1)   # refund the unused slot
+                self._rejected += 1
+                self._cond.notify_all()
+                return False
+            waited = self._clock() - start
+            self._admitted += 1
+            self._total_wait += waited
+            self._last_wait = waited
+            self._max_wait_seen = max(self._max_wait_seen, waited)
+            return True
+
+    def stats(self):
+        """Snapshot of queue depth, wait times and quota usage."""
+        with self._cond:
+            self._refill()
+            by_priority = {"interactive": 0, "bulk": 0}
+            for priority, _ in self._waiting:
+                by_priority["interactive" if priority == INTERACTIVE else "bulk"] += 1
+            return {
+                "queue_depth": len(self._waiting),
+                "queue_by_priority": by_priority,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "avg_wait": round(self._total_wait / self._admitted, 3) if self._admitted else 0.0,
+                "max_wait": round(self._max_wait_seen, 3),
+                "last_wait": round(self._last_wait, 3),
+                "tokens": round(self._tokens, 2),
+                "used_today": self._used_today(),
+                "used_by_node": self._used,
+                "daily_quota": self.daily_quota,
+                "remaining_today": self._remaining(INTERACTIVE),
+            }
+
+
+# ======================
+# Shared instance (configured from environment)
+# Import it as `src.scheduler` everywhere: a bare `scheduler` import would load
+# a second module object with its own bucket and quota.
+#
+# SERPAPI_DAILY_QUOTA is shared by all nodes via the counter backend
+# (CACHE_BACKEND=redis; the Redis holding it must use noeviction, see
+# get_counter_backend). SERPAPI_RATE / SERPAPI_BURST are the totals across
+# SERPAPI_NODES processes (app nodes x workers); each process gets its share.
+# ======================
+_nodes = max(1, int(_env_float("SERPAPI_NODES", 1)))
+
+serp_scheduler = SerpScheduler(
+    rate=_env_float("SERPAPI_RATE", 1.0) / _nodes,
+    burst=max(1.0, _env_float("SERPAPI_BURST", 5) / _nodes),
+    daily_quota=_env_float("SERPAPI_DAILY_QUOTA", None),
+    reserve=_env_float("SERPAPI_INTERACTIVE_RESERVE", 0),
+    low_water=_env_float("SERPAPI_LOW_WATER", 10),
+    max_wait=_env_float("SERPAPI_MAX_WAIT", 15.0),
+    counter=get_counter_backend(),
+)
@@ -0,0 +1,127 @@
+import os
+import sys
+import socket
+import threading
+
+import pytest
+
+# Make `src.*` importable when pytest is run from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# ======================
+# Local RESP stand-in
+# ======================
+class RespStandIn:
+    """
+    Tiny Redis-protocol server for tests: GET, SET [EX|PX], DEL, RPUSH, LRANGE,
+    INCRBY, EXPIRE, PING, AUTH and SELECT (only db 0 exists).
+    """
+    def __init__(self):
+        self.values = {}
+        self.lists = {}
+        self.commands = []
+        self.drop_before_reply = set()   # command names executed but never answered
+        self._clients = []
+        self._lock = threading.Lock()
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen()
+        self.port = self._server.getsockname()[1]
+        self._running = True
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while self._running:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            with self._lock:
+                self._clients.append(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        reader = conn.makefile("rb")
+        try:
+            while True:
+                line = reader.readline()
+                if not line:
+                    return
+                args = []
+                for _ in range(int(line[1:])):
+                    length = int(reader.readline()[1:])
+                    args.append(reader.read(length + 2)[:-2].decode("utf-8"))
+                name = args[0].upper()
+                with self._lock:
+                    self.commands.append(args)
+                    reply = self._execute(name, args[1:])
+                if name in self.drop_before_reply:
+                    self.drop_before_reply.discard(name)
+                    conn.close()
+                    return
+                conn.sendall(reply)
+        except OSError:
+            return
+
+    @staticmethod
+    def _bulk(value):
+        if value is None:
+            return b"$-1\r\n"
+        data = value.encode("utf-8")
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    def _execute(self, name, args):
+        if name in ("PING", "AUTH"):
+            return b"+OK\r\n"
+        if name == "SELECT":
+            return b"+OK\r\n" if args[0] == "0" else b"-ERR DB index is out of range\r\n"
+        if name == "GET":
+            return self._bulk(self.values.get(args[0]))
+        if name == "SET":
+            self.values[args[0]] = args[1]
+            return b"+OK\r\n"
+        if name == "DEL":
+            found = self.values.pop(args[0], None) is not None or self.lists.pop(args[0], None) is not None
+            return b":%d\r\n" % int(found)
+        if name == "RPUSH":
+            self.lists.setdefault(args[0], []).append(args[1])
+            return b":%d\r\n" % len(self.lists[args[0]])
+        if name == "LRANGE":
+            items = self.lists.get(args[0], [])
+            return b"*%d\r\n" % len(items) + b"".join(self._bulk(i) for i in items)
+        if name == "INCRBY":
+            value = int(self.values.get(args[0], "0")) + int(args[1])
+            self.values[args[0]] = str(value)
+            return b":%d\r\n" % value
+        if name == "EXPIRE":
+            return b":1\r\n"
+        return b"-ERR unknown command\r\n"
+
+    def drop_connections(self):
+        """Hang up on every connected client (simulates a server restart)."""
+        with self._lock:
+            for conn in self._clients:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                    conn.close()
+                except OSError:
+                    pass
+            self._clients = []
+
+    def close(self):
+        self._running = False
+        try:
+            self._server.shutdown(socket.SHUT_RDWR)   # unblocks accept() on Linux
+        except OSError:
+            pass
+        self._server.close()
+        self.drop_connections()
+
+
+@pytest.fixture
+def resp_server():
+    server = RespStandIn()
+    yield server
+    server.close()
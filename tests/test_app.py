@@ -0,0 +1,164 @@
+import os
+import importlib
+
+import pytest
+
+for _dep in ("flask", "requests", "joblib", "tldextract", "dotenv", "sklearn"):
+    pytest.importorskip(_dep)
+
+from src.backends import MemoryBackend, ResponseCache, VerdictCache
+from src.scheduler import SerpScheduler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLAIM = "Aliens landed in Kolkata"
+WEB = {"organic_results": [{"link": "https://www.bbc.com/a", "title": "Alien story debunked", "snippet": ""}]}
+NEWS = {"news_results": [{"link": "https://www.reuters.com/b", "title": "Hoax spreads", "snippet": ""}]}
+WIKI = {"organic_results": [{"snippet": "A rumor with no basis"}]}
+
+
+class FakeModel:
+    def predict_proba(self, X):
+        return [[0.2, 0.8]]          # label 1 = Fake
+
+
+class FakeVectorizer:
+    def transform(self, texts):
+        return texts
+
+
+@pytest.fixture
+def app_module(monkeypatch):
+    monkeypatch.chdir(ROOT)          # app.py loads models/ and history.json relative to cwd
+    module = importlib.import_module("app")
+    monkeypatch.setattr(module, "model", FakeModel())
+    monkeypatch.setattr(module, "vectorizer", FakeVectorizer())
+    monkeypatch.setattr(module, "serp_scheduler", SerpScheduler(rate=100, burst=100, max_wait=0))
+    monkeypatch.setattr(module, "response_cache", ResponseCache(MemoryBackend()))
+    monkeypatch.setattr(module, "verdict_cache", VerdictCache(MemoryBackend()))
+    return module
+
+
+def fake_search(calls, answers):
+    def search(query, engine="google", priority=None):
+        calls.append((query, engine))
+        return answers.get((query, engine))
+    return search
+
+
+# ======================
+# Model-only fallback
+# ======================
+def test_empty_plan_uses_model_verdict(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "serp_scheduler", SerpScheduler(daily_quota=0))
+    calls = []
+    monkeypatch.setattr(app_module, "serpapi_search", fake_search(calls, {}))
+    result = app_module.vote_on_claim(CLAIM)
+    assert result["label"] == "Model: FALSE ❌ (search unavailable)"
+    assert result["confidence"] == "80.0%"
+    assert result["sources"] == ["ML model"]
+    assert calls == []
+
+
+def test_all_planned_searches_rejected_uses_model_verdict(app_module, monkeypatch):
+    calls = []
+    monkeypatch.setattr(app_module, "serpapi_search", fake_search(calls, {}))
+    result = app_module.vote_on_claim(CLAIM)
+    assert len(calls) == 3
+    assert result["label"].startswith("Model:")
+
+
+def test_low_budget_runs_only_web_pass(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "serp_scheduler",
+                        SerpScheduler(rate=100, burst=100, daily_quota=5, low_water=10, max_wait=0))
+    calls = []
+    monkeypatch.setattr(app_module, "serpapi_search", fake_search(calls, {(CLAIM, "google"): WEB}))
+    result = app_module.vote_on_claim(CLAIM)
+    assert calls == [(CLAIM, "google")]
+    assert result["label"] == "Fact: FALSE ❌"
+    assert result["sources"] == ["bbc.com"]
+
+
+# ======================
+# serpapi_search failure signalling
+# ======================
+class FakeResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+@pytest.mark.parametrize("response", [
+    FakeResponse(429, {"error": "throttled"}),
+    FakeResponse(500, {}),
+    FakeResponse(200, {"error": "Invalid API key"}),
+])
+def test_serpapi_search_failures_return_none(app_module, monkeypatch, response):
+    monkeypatch.setattr(app_module.requests, "get", lambda *args, **kwargs: response)
+    assert app_module.serpapi_search("q") is None
+
+
+def test_serpapi_search_exception_returns_none(app_module, monkeypatch):
+    def boom(*args, **kwargs):
+        raise app_module.requests.Timeout("slow")
+    monkeypatch.setattr(app_module.requests, "get", boom)
+    assert app_module.serpapi_search("q") is None
+
+
+def test_serpapi_search_rejected_by_scheduler(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "serp_scheduler", SerpScheduler(daily_quota=0))
+    monkeypatch.setattr(app_module.requests, "get", lambda *args, **kwargs: pytest.fail("sent a request"))
+    assert app_module.serpapi_search("q") is None
+
+
+# ======================
+# Response + verdict caches
+# ======================
+class NoScheduler:
+    """Fails the test if anything reaches the scheduler."""
+    def plan(self, *args, **kwargs):
+        pytest.fail("scheduler.plan called on a cache hit")
+
+    def acquire(self, *args, **kwargs):
+        pytest.fail("scheduler.acquire called on a cache hit")
+
+
+def test_verdict_cache_hit_skips_scheduler(app_module, monkeypatch):
+    cached = {"label": "Fact: TRUE ✅", "confidence": "100.0%", "votes": {}, "sources": ["bbc.com"]}
+    app_module.verdict_cache.set(CLAIM, cached)
+    monkeypatch.setattr(app_module, "serp_scheduler", NoScheduler())
+    assert app_module.vote_on_claim("  aliens LANDED in kolkata ") == cached
+
+
+def test_response_cache_hit_skips_scheduler(app_module, monkeypatch):
+    app_module.response_cache.set("q", "google", WEB)
+    monkeypatch.setattr(app_module, "serp_scheduler", NoScheduler())
+    assert app_module.serpapi_search("q") == WEB
+
+
+def test_full_verdict_is_cached(app_module, monkeypatch):
+    answers = {(CLAIM, "google"): WEB, (CLAIM, "google_news"): NEWS,
+               (CLAIM + " site:wikipedia.org", "google"): WIKI}
+    monkeypatch.setattr(app_module, "serpapi_search", fake_search([], answers))
+    result = app_module.vote_on_claim(CLAIM)
+    assert app_module.verdict_cache.get(CLAIM) == result
+
+
+@pytest.mark.parametrize("answers", [
+    {(CLAIM, "google"): WEB, (CLAIM, "google_news"): NEWS},   # wiki pass rejected/failed
+    {},                                                       # model-only fallback
+])
+def test_degraded_verdict_not_cached(app_module, monkeypatch, answers):
+    monkeypatch.setattr(app_module, "serpapi_search", fake_search([], answers))
+    app_module.vote_on_claim(CLAIM)
+    assert app_module.verdict_cache.get(CLAIM) is None
+
+
+def test_low_budget_verdict_not_cached(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "serp_scheduler",
+                        SerpScheduler(rate=100, burst=100, daily_quota=5, low_water=10, max_wait=0))
+    monkeypatch.setattr(app_module, "serpapi_search", fake_search([], {(CLAIM, "google"): WEB}))
+    app_module.vote_on_claim(CLAIM)
+    assert app_module.verdict_cache.get(CLAIM) is None
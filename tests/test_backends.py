@@ -0,0 +1,208 @@
+import os
+import time
+import multiprocessing
+
+import pytest
+
+from src.backends import (
+    MemoryBackend, RedisBackend, ShardedBackend, HashRing,
+    ResponseCache, VerdictCache, HistoryStore, FileHistoryStore,
+)
+
+
+# ======================
+# RedisBackend against the local RESP stand-in
+# ======================
+def test_get_set_with_ttl(resp_server):
+    r = RedisBackend(port=resp_server.port)
+    assert r.get("missing") is None
+    r.set("k", "v", ttl=30)
+    assert r.get("k") == "v"
+    assert resp_server.commands[-2] == ["SET", "k", "v", "PX", "30000"]
+
+
+def test_rpush_lrange_and_non_ascii(resp_server):
+    r = RedisBackend(port=resp_server.port)
+    r.set("claim", "মেসি ⚽ café")
+    assert r.get("claim") == "মেসি ⚽ café"
+    for item in ["a", "ü", "✅"]:
+        r.rpush("history", item)
+    assert r.lrange("history") == ["a", "ü", "✅"]
+    assert r.lrange("empty") == []
+
+
+def test_incr_sets_ttl_on_creation(resp_server):
+    r = RedisBackend(port=resp_server.port)
+    assert r.incr("quota", 1, ttl=60) == 1
+    assert r.incr("quota", 1, ttl=60) == 2
+    assert r.incr("quota", -1) == 1
+    assert [c[0] for c in resp_server.commands].count("EXPIRE") == 1
+
+
+def test_error_reply_keeps_connection(resp_server):
+    r = RedisBackend(port=resp_server.port)
+    with pytest.raises(RuntimeError):
+        r.command("NOPE")
+    r.set("k", "v")
+    assert r.get("k") == "v"
+
+
+def test_reconnects_after_server_hangup(resp_server):
+    r = RedisBackend(port=resp_server.port)
+    r.rpush("history", "a")
+    resp_server.drop_connections()
+    time.sleep(0.05)
+    r.rpush("history", "b")
+    assert resp_server.lists["history"] == ["a", "b"]
+
+
+def test_lost_reply_is_not_resent(resp_server):
+    r = RedisBackend(port=resp_server.port, retry_after=0)
+    resp_server.drop_before_reply.add("RPUSH")
+    with pytest.raises(ConnectionError):
+        r.rpush("history", "once")
+    assert resp_server.lists["history"] == ["once"]
+    assert r.lrange("history") == ["once"]
+
+
+def test_failed_select_does_not_leave_connection(resp_server):
+    r = RedisBackend(port=resp_server.port, db=3)
+    with pytest.raises(RuntimeError):
+        r.get("k")
+    assert r._sock is None
+
+
+def test_unreachable_server_fails_fast_and_stores_fail_open(resp_server):
+    port = resp_server.port
+    resp_server.close()
+    dead = RedisBackend(port=port, retry_after=60)
+    history = HistoryStore(dead)
+    cache = ResponseCache(dead)
+
+    history.append({"text": "x"})
+    start = time.monotonic()
+    assert history.all() == []
+    assert cache.get("q", "google") is None
+    cache.set("q", "google", {"a": 1})
+    assert time.monotonic() - start < 0.5     # marked down, no reconnect attempts
+
+
+# ======================
+# Consistent hashing
+# ======================
+def test_sharded_backend_spreads_keys(resp_server):
+    shards = {"redis": RedisBackend(port=resp_server.port), "m1": MemoryBackend(), "m2": MemoryBackend()}
+    sharded = ShardedBackend(shards)
+    keys = [f"verdict:{i}" for i in range(300)]
+    for key in keys:
+        sharded.set(key, key)
+
+    counts = {name: 0 for name in shards}
+    for key in keys:
+        counts[sharded.ring.node_for(key)] += 1
+        assert sharded.get(key) == key
+        assert sharded.backend_for(key).get(key) == key
+    assert all(count > 50 for count in counts.values())
+    assert len(resp_server.values) == counts["redis"]
+
+
+def test_hash_ring_moves_few_keys():
+    ring = HashRing(["a", "b", "c", "d"])
+    keys = [str(i) for i in range(5000)]
+    before = {k: ring.node_for(k) for k in keys}
+
+    ring.add("e")
+    moved = [k for k in keys if ring.node_for(k) != before[k]]
+    assert all(ring.node_for(k) == "e" for k in moved)
+    assert len(moved) < len(keys) * 0.3          # ~1/5 expected
+
+    ring.remove("e")
+    assert {k: ring.node_for(k) for k in keys} == before
+
+    ring.remove("a")
+    moved = [k for k in keys if ring.node_for(k) != before[k]]
+    assert all(before[k] == "a" for k in moved)
+
+
+# ======================
+# MemoryBackend + stores
+# ======================
+def test_memory_backend_ttl_sweep_and_cap():
+    m = MemoryBackend(max_keys=3, sweep_every=2)
+    m.set("short", "1", ttl=0.01)
+    time.sleep(0.02)
+    m.set("x", "2")                 # second write triggers a sweep
+    assert "short" not in m._values
+
+    for i in range(5):
+        m.set(f"k{i}", "v")
+    assert list(m._values) == ["k2", "k3", "k4"]
+
+    m.set("zero", "v", ttl=0)
+    assert m.get("zero") is None
+
+
+def test_caches_disabled_with_zero_ttl():
+    backend = MemoryBackend()
+    cache = ResponseCache(backend, ttl=0)
+    cache.set("q", "google", {"a": 1})
+    assert cache.get("q", "google") is None
+    assert backend._values == {}
+
+
+def test_verdict_cache_normalizes_claims():
+    cache = VerdictCache(MemoryBackend())
+    cache.set("Messi  is DEAD?", {"label": "x"})
+    assert cache.get("messi is dead?") == {"label": "x"}
+
+
+def test_file_history_store(tmp_path):
+    store = FileHistoryStore(str(tmp_path / "history.json"))
+    assert store.all() == []
+    store.append({"text": "a"})
+    store.append({"text": "b"})
+    assert store.all() == [{"text": "a"}, {"text": "b"}]
+
+
+def test_quota_counter_survives_cache_eviction(monkeypatch):
+    import src.backends as backends
+    monkeypatch.setenv("CACHE_BACKEND", "memory")
+    monkeypatch.setattr(backends, "_shared_backend", MemoryBackend(max_keys=3))
+    monkeypatch.setattr(backends, "_counter_backend", None)
+
+    counter = backends.get_counter_backend()
+    assert counter is not backends.get_backend()
+    counter.incr("serp:quota:2026-01-01")
+    cache = ResponseCache(backends.get_backend())
+    for i in range(5):
+        cache.set(f"q{i}", "google", {"i": i})
+    assert counter.get("serp:quota:2026-01-01") == "1"
+
+
+@pytest.mark.skipif(os.name != "posix", reason="flock is POSIX only")
+def test_file_history_store_across_processes(tmp_path):
+    path = str(tmp_path / "history.json")
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_append_many, args=(path, n)) for n in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(10)
+    entries = FileHistoryStore(path).all()
+    assert len(entries) == 4 * 25
+    assert {(e["worker"], e["i"]) for e in entries} == {(w, i) for w in range(4) for i in range(25)}
+
+
+def _append_many(path, worker):
+    store = FileHistoryStore(path)
+    for i in range(25):
+        store.append({"worker": worker, "i": i})
+
+
+def test_caches_fail_open_on_corrupt_values():
+    backend = MemoryBackend()
+    responses, verdicts = ResponseCache(backend), VerdictCache(backend)
+    backend.set(responses.key("q", "google"), '{"truncated":')
+    backend.set(verdicts.key("claim"), "not json")
+    assert responses.get("q", "google") is None
+    assert verdicts.get("claim") is None
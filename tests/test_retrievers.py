@@ -0,0 +1,48 @@
+import os
+import importlib
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("dotenv")
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+@pytest.fixture
+def retrievers(monkeypatch):
+    monkeypatch.syspath_prepend(SRC_DIR)     # retrievers imports `utils` directly
+    module = importlib.import_module("src.retrievers")
+    monkeypatch.setattr(module, "SERPAPI_KEY", "test-key")
+    return module
+
+
+def test_no_search_answered_is_unverifiable(retrievers, monkeypatch):
+    monkeypatch.setattr(retrievers.serp_scheduler, "plan", lambda engines, priority: list(engines))
+    monkeypatch.setattr(retrievers, "serpapi_search", lambda *args, **kwargs: None)
+    result = retrievers.vote_on_claim("messi is dead")
+    assert result["label"] == "Unverifiable (search budget or rate limit)"
+    assert result["sources"] == []
+
+
+def test_empty_plan_is_unverifiable(retrievers, monkeypatch):
+    monkeypatch.setattr(retrievers.serp_scheduler, "plan", lambda engines, priority: [])
+    calls = []
+    monkeypatch.setattr(retrievers, "serpapi_search", lambda *args, **kwargs: calls.append(args))
+    assert retrievers.vote_on_claim("messi is dead")["label"].startswith("Unverifiable")
+    assert calls == []
+
+
+def test_answered_search_still_votes(retrievers, monkeypatch):
+    monkeypatch.setattr(retrievers.serp_scheduler, "plan", lambda engines, priority: ["web"])
+    web = {"organic_results": [{"link": "https://www.bbc.com/x", "title": "Hoax debunked", "snippet": ""}]}
+    monkeypatch.setattr(retrievers, "serpapi_search", lambda *args, **kwargs: web)
+    result = retrievers.vote_on_claim("messi is dead")
+    assert result["label"] == "Fact: FALSE ❌"
+    assert result["sources"] == ["bbc.com"]
+
+
+def test_serpapi_search_returns_none_when_rejected(retrievers, monkeypatch):
+    monkeypatch.setattr(retrievers.response_cache, "enabled", False)
+    monkeypatch.setattr(retrievers.serp_scheduler, "acquire", lambda priority: False)
+    assert retrievers.serpapi_search("q") is None
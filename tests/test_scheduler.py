@@ -0,0 +1,199 @@
+import time
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+from src.backends import MemoryBackend
+from src.scheduler import SerpScheduler, INTERACTIVE, BULK
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make(clock=None, **kwargs):
+    kwargs.setdefault("max_wait", 0)
+    return SerpScheduler(clock=clock or FakeClock(), **kwargs)
+
+
+def wake(sched):
+    with sched._cond:
+        sched._cond.notify_all()
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+# ======================
+# Token bucket + priority
+# ======================
+def test_burst_then_rate_limited():
+    clock = FakeClock()
+    sched = make(clock, rate=2, burst=2)
+    assert sched.acquire(BULK) and sched.acquire(BULK)
+    assert not sched.acquire(BULK)          # bucket empty, max_wait=0
+    clock.now += 0.5                        # 2/s -> one token back
+    assert sched.acquire(BULK)
+
+
+def test_interactive_served_before_queued_bulk():
+    clock = FakeClock()
+    sched = make(clock, rate=1, burst=1, max_wait=None)
+    assert sched.acquire(BULK)              # drain the bucket
+    order = []
+
+    def worker(priority, name):
+        if sched.acquire(priority):
+            order.append(name)
+
+    bulk = threading.Thread(target=worker, args=(BULK, "bulk"))
+    bulk.start()
+    wait_for(lambda: sched.stats()["queue_depth"] == 1)
+    interactive = threading.Thread(target=worker, args=(INTERACTIVE, "interactive"))
+    interactive.start()
+    wait_for(lambda: sched.stats()["queue_depth"] == 2)
+
+    clock.now += 1
+    wake(sched)
+    wait_for(lambda: order == ["interactive"])
+    clock.now += 1
+    wake(sched)
+    bulk.join(2)
+    interactive.join(2)
+    assert order == ["interactive", "bulk"]
+    assert sched.stats()["queue_depth"] == 0
+
+
+def test_timeout_rejects_and_is_counted():
+    sched = make(rate=1, burst=1)
+    assert sched.acquire(INTERACTIVE)
+    assert not sched.acquire(INTERACTIVE, timeout=0)
+    stats = sched.stats()
+    assert stats["rejected"] == 1
+    assert stats["queue_depth"] == 0
+
+
+# ======================
+# Daily quota
+# ======================
+def test_reserve_is_kept_for_interactive():
+    sched = make(rate=100, burst=100, daily_quota=3, reserve=1)
+    assert sched.acquire(BULK) and sched.acquire(BULK)
+    assert not sched.acquire(BULK)
+    assert sched.acquire(INTERACTIVE)
+    assert not sched.acquire(INTERACTIVE)
+    assert sched.remaining(INTERACTIVE) == 0
+
+
+def test_quota_resets_on_new_utc_day():
+    day = [date(2026, 1, 1)]
+    sched = make(rate=100, burst=100, daily_quota=1, today=lambda: day[0])
+    assert sched.acquire(INTERACTIVE)
+    assert not sched.acquire(INTERACTIVE)
+    day[0] += timedelta(days=1)
+    assert sched.remaining() == 1
+    assert sched.acquire(INTERACTIVE)
+
+
+def test_zero_quota_means_no_searches():
+    sched = make(daily_quota=0)
+    assert sched.remaining() == 0
+    assert sched.plan(["web"]) == []
+    assert not sched.acquire(INTERACTIVE)
+
+
+def test_shared_counter_spans_schedulers():
+    counter = MemoryBackend()
+    day = lambda: date(2026, 1, 1)
+    a = make(rate=100, burst=100, daily_quota=3, counter=counter, today=day)
+    b = make(rate=100, burst=100, daily_quota=3, counter=counter, today=day)
+    assert a.acquire(BULK) and b.acquire(BULK) and a.acquire(BULK)
+    assert not b.acquire(BULK)
+    assert b.stats()["used_today"] == 3
+    assert b.stats()["used_by_node"] == 1
+
+
+# ======================
+# plan() degradation
+# ======================
+def test_plan_thresholds():
+    engines = ["web", "news", "wiki"]
+    sched = make(rate=100, burst=100, daily_quota=13, low_water=10)
+    assert sched.plan(engines) == engines           # 13 left
+    for _ in range(3):
+        sched.acquire(INTERACTIVE)
+    assert sched.plan(engines) == ["web"]           # 10 left: at low water
+    for _ in range(10):
+        sched.acquire(INTERACTIVE)
+    assert sched.plan(engines) == []                # spent: model-only
+
+
+def test_plan_unlimited_runs_everything():
+    assert make().plan(["web", "news"]) == ["web", "news"]
+
+
+# ======================
+# Config validation
+# ======================
+@pytest.mark.parametrize("kwargs", [
+    {"rate": 0},
+    {"burst": 0.5},
+    {"daily_quota": -1},
+    {"daily_quota": 2, "reserve": 3},
+    {"reserve": -1},
+    {"low_water": -1},
+    {"max_wait": -1},
+])
+def test_invalid_settings_rejected(kwargs):
+    with pytest.raises(ValueError):
+        SerpScheduler(**kwargs)
+
+
+def test_shared_counter_not_read_in_acquire_loop():
+    class CountingBackend(MemoryBackend):
+        gets = 0
+
+        def get(self, key):
+            CountingBackend.gets += 1
+            return super().get(key)
+
+    counter = CountingBackend()
+    sched = make(rate=100, burst=100, daily_quota=2, counter=counter)
+    assert sched.acquire(INTERACTIVE) and sched.acquire(INTERACTIVE)
+    assert not sched.acquire(INTERACTIVE)
+    sched.stats()
+    assert CountingBackend.gets == 0
+
+
+def test_shared_counter_outage_falls_back_to_local_count(capsys):
+    class FlakyBackend(MemoryBackend):
+        down = True
+
+        def incr(self, key, amount=1, ttl=None):
+            if self.down:
+                raise ConnectionError("down")
+            return super().incr(key, amount, ttl)
+
+    counter = FlakyBackend()
+    sched = make(rate=100, burst=100, daily_quota=3, counter=counter)
+    assert sched.acquire(INTERACTIVE)
+    assert sched.acquire(INTERACTIVE)
+    counter.down = False
+    assert sched.acquire(INTERACTIVE)
+    assert not sched.acquire(INTERACTIVE)       # outage queries still count locally
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == [
+        "[Scheduler] quota counter unreachable, counting locally: down",
+        "[Scheduler] quota counter reachable again",
+    ]